@@ -1,16 +1,51 @@
 '''Face animator'''
 import os
 import cv2
-import copy
 import socket
 import threading
+import warnings
 import trimesh
 import pyrender
 import numpy as np
 
 from pyrender_mod import from_trimesh
 
+try:
+    from numba import njit
+except ImportError: # numba is optional, fall back to the numpy update path
+    njit = None
+
+def _blend_exp(coeff, active_bases, mean_shape_flat, eye_index, eye_vals, out):
+    """Fused vertex update: out = mean_shape + coeff @ active_bases, then pin the eye vertices to precomputed values
+
+    Args:
+        coeff (np.ndarray): (n,) expression coefficients
+        active_bases (np.ndarray): (n, 3V) expression bases
+        mean_shape_flat (np.ndarray): (3V,) mean shape
+        eye_index (np.ndarray): (m,) indices of the eye vertices
+        eye_vals (np.ndarray): (m, 3) fixed positions of the eye vertices
+        out (np.ndarray): (3V,) output vertices
+    """
+    # innermost loops walk the contiguous 3V axis, one vectorized FMA pass per basis
+    for i in range(out.shape[0]):
+        out[i] = mean_shape_flat[i]
+    for b in range(coeff.shape[0]):
+        c = coeff[b]
+        basis = active_bases[b]
+        for i in range(out.shape[0]):
+            out[i] += c * basis[i]
+    for i in range(eye_index.shape[0]):
+        for k in range(3):
+            out[3*eye_index[i]+k] = eye_vals[i, k]
+
+_blend_exp = njit(cache=True, fastmath=True, boundscheck=False)(_blend_exp) if njit is not None else None
+
 class FaceAnimator(object):
+    ACTIVE_EXP_NUM = 7 # number of expression bases driven by the controller coefficients
+    COEFF_RAW_NUM = 28 # minimum number of raw coefficients in a controller message
+    EYE_DELTA = 0.01 # z offset of the eye vertices from the mean shape
+    UPDATE_TIMEOUT = 0.1 # seconds to wait for new coefficients before checking the viewer again
+
     def __init__(self, ip, port, base_model_path, exp_bases_path, texture_path, eye_index_path=None):
         """Face animator and renderer, driven by coefficients from controller through TCP
 
@@ -34,8 +69,8 @@ class FaceAnimator(object):
         if os.path.isfile(self.base_model_path):
             # init model
             self.base_model = trimesh.load(self.base_model_path)
-            self.normal = self.base_model.vertex_normals # use static normal
-            self.mean_shape = self.base_model.vertices
+            self.normal = np.ascontiguousarray(self.base_model.vertex_normals, dtype=np.float32) # use static normal
+            self.mean_shape = np.ascontiguousarray(self.base_model.vertices, dtype=np.float32)
             # init texture
             self.tex_img = cv2.cvtColor(cv2.imread(texture_path), cv2.COLOR_BGR2RGB)
         else:
@@ -43,14 +78,28 @@ class FaceAnimator(object):
             exit()
             
     def _init_exp_bases(self, exp_bases_path, eye_index_path):
-        self.exp_bases = np.load(exp_bases_path)
-        print(self.exp_bases.shape)
-        self.exp_num, self.vertices_num, _ = self.exp_bases.shape
-        self.exp_bases = np.reshape(self.exp_bases, (self.exp_num, -1))
-        if os.path.isfile(eye_index_path):
-            self.eye_index = np.loadtxt(eye_index_path, dtype=np.int32)
+        exp_bases = np.load(exp_bases_path, mmap_mode='r') # memory-mapped, only the driven rows are read
+        print(exp_bases.shape)
+        self.exp_num, self.vertices_num, _ = exp_bases.shape
+        # only the driven bases are kept, as a contiguous float32 (n, 3V) matrix for gemv
+        self.active_bases = np.ascontiguousarray(
+            np.reshape(exp_bases, (self.exp_num, -1))[:self.ACTIVE_EXP_NUM], dtype=np.float32)
+        self.mean_shape_flat = self.mean_shape.reshape(-1) # view of the contiguous float32 mean shape
+        # per-frame buffers, reused to avoid allocations in the update cycle
+        self.coeff = np.zeros(self.ACTIVE_EXP_NUM, dtype=np.float32)
+        self.vertices_back = np.empty((self.vertices_num, 3), dtype=np.float32) # written by the update cycle
+        self.vertices_front = np.empty((self.vertices_num, 3), dtype=np.float32) # referenced by the renderer
+        self.vertices_back_flat = self.vertices_back.reshape(-1) # (3V,) views, swapped along with the buffers
+        self.vertices_front_flat = self.vertices_front.reshape(-1)
+        if eye_index_path is not None and os.path.isfile(eye_index_path):
+            self.eye_index = np.loadtxt(eye_index_path, dtype=np.int64, ndmin=1)
         else:
-            self.eye_index = None
+            self.eye_index = np.empty(0, dtype=np.int64)
+        # eye vertices are pinned to the mean shape, shifted back by EYE_DELTA
+        self.eye_vals = self.mean_shape[self.eye_index].copy()
+        self.eye_vals[:, 2] -= self.EYE_DELTA
+        if _blend_exp is not None:
+            _blend_exp(self.coeff, self.active_bases, self.mean_shape_flat, self.eye_index, self.eye_vals, self.vertices_back_flat) # warm up, compile before the first frame
             
     def _init_pyrender(self):
         # init shader texture
@@ -65,8 +114,8 @@ class FaceAnimator(object):
         self.scene.add(dl)
         self.scene.add(sl)
         # init model
-        self.mesh = copy.deepcopy(self.base_model)
-        mesh_tmp = pyrender.Mesh.from_trimesh(self.base_model, material=self.mat)
+        mesh_tmp = from_trimesh(self.base_model, self.normal, material=self.mat)
+        self.primitive = mesh_tmp.primitives[0] # built once, only its positions change per frame
         self.node_buf = pyrender.Node(mesh=mesh_tmp, matrix=np.eye(4))
         self.scene.add_node(self.node_buf)
     
@@ -83,6 +132,8 @@ class FaceAnimator(object):
         print(f"[Face Animation Client] Client connected to Server {ip}:{port}, ready to receive massages...")
         
     def _init_client_thread(self):
+        self._coeff_ref = None # latest parsed coefficients, published by the client thread
+        self._new_data = threading.Event() # set when new coefficients are published
         self.client_thread = threading.Thread(target=self._recv_message)
         self.client_thread.setDaemon(True) # killed when main thread stops
         self.client_thread.start()
@@ -91,50 +142,91 @@ class FaceAnimator(object):
         try:
             while True:
                 data, addr = self.tcp_client.recvfrom(1024)
-                self.raw_data = data.decode()
+                if not data:
+                    raise ConnectionError("connection closed by server")
+                # drain pending messages, only the latest one is parsed and displayed
+                self.tcp_client.setblocking(False)
+                try:
+                    while True:
+                        pending = self.tcp_client.recv(1024)
+                        if not pending:
+                            break
+                        data = pending
+                except BlockingIOError:
+                    pass
+                finally:
+                    self.tcp_client.setblocking(True)
+                coeff_raw = self._parse_message(data) # parse on receive, off the render loop
+                if coeff_raw is not None:
+                    self._coeff_ref = coeff_raw # single reference assignment, atomic under the GIL
+                    self._new_data.set()
                 # print(f'\r[Face Animation Client] From Server: {data.decode()}', end='')
         except Exception as e:
             print(f"\n[Face Animation Client] Lose Connection with Server {self.ip}:{self.port}, error message: {e}")
             
+    def _parse_message(self, data):
+        """Parse a controller message into raw coefficients
+
+        Args:
+            data (bytes): comma-separated coefficients
+
+        Returns:
+            np.ndarray: (k,) float32 raw coefficients, or None if the message is malformed
+        """
+        try:
+            with warnings.catch_warnings():
+                # numpy < 2 only warns on trailing garbage and returns the parsed prefix
+                warnings.simplefilter('error', DeprecationWarning)
+                coeff_raw = np.fromstring(data.decode(), dtype=np.float32, sep=',')
+        except (ValueError, DeprecationWarning): # ValueError also covers UnicodeDecodeError
+            return None
+        if coeff_raw.size < self.COEFF_RAW_NUM:
+            return None
+        return coeff_raw
+            
     # update cycles
     
-    def _update_vertices(self, eye_delta=0.01):
-        try:
-            # update coeff
-            self.coeff_raw = np.array([float(x) for x in self.raw_data.split(',')])
-            coeff = np.zeros(self.exp_num)
-            coeff[0] = self.coeff_raw[25]/80 # Mouth Open
-            coeff[1] = self.coeff_raw[13]/80 # Left Eye Close
-            coeff[1] = coeff[1] * coeff[1] * coeff[1] # eye tweak
-            coeff[2] = self.coeff_raw[12]/80 # Right Eye Close
-            coeff[2] = coeff[2] * coeff[2] * coeff[2] # eye tweak
-            coeff[3] = self.coeff_raw[27]/80 # Lips Funnel
-            coeff[4] = self.coeff_raw[5]/80 # Brows Center Up
-            coeff[5] = self.coeff_raw[6]/80 # Brows Left Up
-            coeff[6] = self.coeff_raw[7]/80 # Brows Right Up
-            # update vertices (shape)
-            v = (coeff @ self.exp_bases).reshape(self.vertices_num, 3) + self.mean_shape
-            if self.eye_index is not None:
-                for idx in self.eye_index:
-                    v[idx] = self.mean_shape[idx]
-                    v[idx][2] -= eye_delta
-                return v
-        except Exception:
+    def _update_vertices(self):
+        coeff_raw = self._coeff_ref # consistent snapshot of the latest message
+        if coeff_raw is None:
             return self.mean_shape
+        # update coeff
+        coeff = self.coeff
+        coeff[0] = coeff_raw[25]/80 # Mouth Open
+        coeff[1] = coeff_raw[13]/80 # Left Eye Close
+        coeff[1] = coeff[1] * coeff[1] * coeff[1] # eye tweak
+        coeff[2] = coeff_raw[12]/80 # Right Eye Close
+        coeff[2] = coeff[2] * coeff[2] * coeff[2] # eye tweak
+        coeff[3] = coeff_raw[27]/80 # Lips Funnel
+        coeff[4] = coeff_raw[5]/80 # Brows Center Up
+        coeff[5] = coeff_raw[6]/80 # Brows Left Up
+        coeff[6] = coeff_raw[7]/80 # Brows Right Up
+        # update vertices (shape)
+        if _blend_exp is not None:
+            _blend_exp(coeff, self.active_bases, self.mean_shape_flat, self.eye_index, self.eye_vals, self.vertices_back_flat)
+            return self.vertices_back
+        np.dot(coeff, self.active_bases, out=self.vertices_back_flat)
+        np.add(self.vertices_back_flat, self.mean_shape_flat, out=self.vertices_back_flat)
+        v = self.vertices_back
+        v[self.eye_index] = self.eye_vals
+        return v
     
     def _update_pyrender(self, vertices):
-        self.mesh.vertices = vertices
-        mesh_tmp = from_trimesh(self.mesh, self.normal, material=self.mat)
         self.view.render_lock.acquire()
-        self.scene.remove_node(self.node_buf)
-        self.node_buf = pyrender.Node(mesh=mesh_tmp, matrix=np.eye(4))
-        self.scene.add_node(self.node_buf)
+        self.primitive.update_positions(vertices)
         self.view.render_lock.release()
+        # swap buffers, the next frame is computed while the renderer reads this one
+        self.vertices_back, self.vertices_front = self.vertices_front, self.vertices_back
+        self.vertices_back_flat, self.vertices_front_flat = self.vertices_front_flat, self.vertices_back_flat
         
     # user apis
             
     def start(self):
         while self.view.is_active:
+            # only update when the controller sent new coefficients, wake up periodically to check the viewer
+            if not self._new_data.wait(timeout=self.UPDATE_TIMEOUT):
+                continue
+            self._new_data.clear()
             vertices = self._update_vertices()
             self._update_pyrender(vertices)
         self.tcp_client.close()
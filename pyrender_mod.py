@@ -1,11 +1,70 @@
 import copy
+import ctypes
 import pyrender
 import numpy as np
 import trimesh
+from OpenGL.GL import (
+    glBindVertexArray, glGenBuffers, glBindBuffer, glBufferData, glBufferSubData,
+    glVertexAttribPointer, glEnableVertexAttribArray,
+    GL_ARRAY_BUFFER, GL_DYNAMIC_DRAW, GL_FLOAT, GL_FALSE
+)
+from pyrender.constants import FLOAT_SZ
+
+
+class DynamicPrimitive(pyrender.primitive.Primitive):
+    """A :class:`~pyrender.primitive.Primitive` whose vertex positions can be
+    updated in place. The static attributes (normals, texture coordinates,
+    colors, indices) are uploaded once; positions live in their own vertex
+    buffer and only they are streamed to the GPU on the next bind, from the
+    rendering thread that owns the OpenGL context.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(DynamicPrimitive, self).__init__(*args, **kwargs)
+        self._positions_buffer = None
+        self._positions_dirty = False
+
+    def update_positions(self, positions):
+        """Set new vertex positions, to be uploaded on the next draw.
+
+        Parameters
+        ----------
+        positions : (n,3) float
+            Vertex positions, with the same vertex count as the current ones.
+            Contiguous float32 positions are referenced, not copied, so they
+            must not be modified until replaced.
+        """
+        self.positions = positions
+        self._positions_dirty = True
+
+    def _add_to_context(self):
+        super(DynamicPrimitive, self)._add_to_context()
+        # point the position attribute (location 0) at a dedicated dynamic buffer,
+        # the copy interleaved with the static attributes is no longer read
+        glBindVertexArray(self._vaid)
+        self._positions_buffer = glGenBuffers(1)
+        self._buffers.append(self._positions_buffer)
+        glBindBuffer(GL_ARRAY_BUFFER, self._positions_buffer)
+        glBufferData(GL_ARRAY_BUFFER, self.positions.nbytes, self.positions, GL_DYNAMIC_DRAW)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 3 * FLOAT_SZ, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(0)
+        glBindVertexArray(0)
+        self._positions_dirty = False
+
+    def _remove_from_context(self):
+        super(DynamicPrimitive, self)._remove_from_context()
+        self._positions_buffer = None
+
+    def _bind(self):
+        super(DynamicPrimitive, self)._bind()
+        if self._positions_dirty:
+            glBindBuffer(GL_ARRAY_BUFFER, self._positions_buffer)
+            glBufferSubData(GL_ARRAY_BUFFER, 0, self.positions.nbytes, self.positions)
+            self._positions_dirty = False
 
 def from_trimesh(mesh, normal, material=None, is_visible=True,
                      poses=None, wireframe=False, smooth=True):
-    """Create a Mesh from a :class:`~trimesh.base.Trimesh`.
+    """Create a Mesh of :class:`DynamicPrimitive` from a :class:`~trimesh.base.Trimesh`.
 
     Parameters
     ----------
@@ -58,10 +117,9 @@ def from_trimesh(mesh, normal, material=None, is_visible=True,
         # Compute colors, texture coords, and material properties
         color_0, texcoord_0, primitive_material = pyrender.Mesh._get_trimesh_props(m, smooth=smooth, material=material)
 
-        # Override if material is given.
+        # Override if material is given, shallow copy shares the texture (a deepcopy would copy it)
         if material is not None:
-            #primitive_material = copy.copy(material)
-            primitive_material = copy.deepcopy(material)  # TODO
+            primitive_material = copy.copy(material)
 
         if primitive_material is None:
             # Replace material with default if needed
@@ -75,7 +133,7 @@ def from_trimesh(mesh, normal, material=None, is_visible=True,
         primitive_material.wireframe = wireframe
 
         # Create the primitive
-        primitives.append(pyrender.primitive.Primitive(
+        primitives.append(DynamicPrimitive(
             positions=positions,
             normals=normals,
             texcoord_0=texcoord_0,